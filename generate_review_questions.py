@@ -1,40 +1,87 @@
 import os
+import hashlib
+import orjson
 import requests
-from pptx import Presentation
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from slide_text import iter_slide_paragraphs, dedupe_texts, condense_slide_texts
 
 UPLOAD_DIR = "uploads"
 OLLAMA_MODEL = "mistral"
+OLLAMA_URL = "http://localhost:11434/api/generate"
+# Alongside the app's Groq response cache, which is git-ignored
+REVIEW_CACHE_DIR = os.path.join(".llm_cache", "review_questions")
+
+# Shared keep-alive session so repeated calls skip the TCP handshake
+_SESSION = requests.Session()
+_retry = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=frozenset(["POST"]),
+    raise_on_status=False,
+)
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=_retry)
+_SESSION.mount("http://", _adapter)
+_SESSION.mount("https://", _adapter)
 
 def extract_slide_text(pptx_path):
-    prs = Presentation(pptx_path)
     slides = []
-    for i, slide in enumerate(prs.slides):
-        texts = []
-        for shape in slide.shapes:
-            if shape.has_text_frame:
-                for para in shape.text_frame.paragraphs:
-                    if para.text.strip():
-                        texts.append(para.text.strip())
+    seen = set()
+    for i, texts in enumerate(iter_slide_paragraphs(pptx_path)):
+        texts = dedupe_texts(texts, seen)
         if texts:
             slides.append(f"Slide {i+1}: " + " ".join(texts))
     return slides
 
-def generate_review_questions(slide_texts, model=OLLAMA_MODEL, num_questions=10):
+def review_questions_cache_path(slide_texts, model, num_questions):
+    # Same slides + model + count -> same file; blake2b is fast and collisions
+    # only cost a regeneration, so no cryptographic hash is needed.
+    parts = [model, str(num_questions), *slide_texts]
+    key = hashlib.blake2b(b"\x00".join(p.encode() for p in parts), digest_size=16).hexdigest()
+    return os.path.join(REVIEW_CACHE_DIR, f"{key}.txt")
+
+def stream_review_questions(slide_texts, model=OLLAMA_MODEL, num_questions=10):
+    cache_path = review_questions_cache_path(slide_texts, model, num_questions)
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            yield f.read()
+        return
+
     content = (
         f"Generate {num_questions} open-ended review questions for students based on this PowerPoint content.\n\n"
-        + "\n".join(slide_texts)
+        + "\n".join(condense_slide_texts(slide_texts))
         + "\n\nOnly list the questions. No answers."
     )
 
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={"model": model, "prompt": content, "stream": False}
-    )
+    # Ollama streams one JSON object per line; yield tokens as they arrive
+    with _SESSION.post(
+        OLLAMA_URL,
+        data=orjson.dumps({"model": model, "prompt": content, "stream": True}),
+        headers={"Content-Type": "application/json"},
+        timeout=(10, 60),
+        stream=True
+    ) as response:
+        if response.status_code != 200:
+            yield f"❌ Failed to generate: {response.text}"
+            return
+        tokens = []
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = orjson.loads(line)
+            token = chunk.get("response", "")
+            tokens.append(token)
+            yield token
+            if chunk.get("done"):
+                # Only cache complete generations
+                os.makedirs(REVIEW_CACHE_DIR, exist_ok=True)
+                with open(cache_path, "w", encoding="utf-8") as f:
+                    f.write("".join(tokens))
+                break
 
-    if response.status_code == 200:
-        return response.json()["response"]
-    else:
-        return f"❌ Failed to generate: {response.text}"
+def generate_review_questions(slide_texts, model=OLLAMA_MODEL, num_questions=10):
+    return "".join(stream_review_questions(slide_texts, model, num_questions))
 
 if __name__ == "__main__":
     pptx_files = [f for f in os.listdir(UPLOAD_DIR) if f.endswith(".pptx")]
@@ -47,8 +94,9 @@ if __name__ == "__main__":
             path = os.path.join(UPLOAD_DIR, pptx_file)
             slides = extract_slide_text(path)
             if slides:
-                result = generate_review_questions(slides[:15])  # Limit for efficiency
                 print("\n📘 Generated Review Questions:\n")
-                print(result)
+                for token in stream_review_questions(slides[:15]):  # Limit for efficiency
+                    print(token, end="", flush=True)
+                print()
             else:
                 print("⚠️ No readable text found in slides.")
@@ -0,0 +1,250 @@
+import streamlit as st
+import os
+import csv
+import asyncio
+import httpx
+import orjson
+import hashlib
+import threading
+import diskcache
+from collections import defaultdict
+from rapidfuzz import process, fuzz
+from slide_text import iter_slide_paragraphs, condense_slide_texts
+
+UPLOAD_DIR = "uploads"
+CUSTOM_QA_FILE = "custom_qa.csv"
+BLOCKED_QA_FILE = "blocked_quiz_questions.csv"
+LLM_CACHE_DIR = ".llm_cache"
+QUIZ_COLUMNS = ['Question', 'Option A', 'Option B', 'Option C', 'Option D', 'Correct Option Index']
+ANSWER_LETTERS = {0: 'A', 1: 'B', 2: 'C', 3: 'D'}
+PARALLEL_MATCH_THRESHOLD = 10_000
+GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_MODEL = "llama3-70b-8192"
+# Prompts longer than this are cut before they are sent
+GROQ_PROMPT_CHARS = 2000
+GROQ_RETRY_STATUSES = {429, 500, 502, 503, 504}
+GROQ_MAX_RETRIES = 3
+# Longest Retry-After we will sleep through on the Streamlit thread
+GROQ_MAX_RETRY_WAIT = 10
+
+def file_mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+# mtime is unused in the body; it is part of the cache key so edits to the
+# CSV invalidate the cached result.
+@st.cache_data(show_spinner=False)
+def load_custom_qna(csv_path=CUSTOM_QA_FILE, mtime=None):
+    # csv.reader rather than pandas: rows here can have one field or extra
+    # fields, which pd.read_csv rejects; such rows are simply skipped.
+    qna = {}
+    if os.path.exists(csv_path):
+        with open(csv_path, "r", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) >= 2:
+                    qna[row[0].strip().lower()] = row[1].strip()
+    return qna
+
+@st.cache_data(show_spinner=False)
+def load_blocked_questions(csv_path=BLOCKED_QA_FILE, mtime=None):
+    if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+        return frozenset()
+    import pandas as pd
+    try:
+        df = pd.read_csv(csv_path, usecols=[0], dtype=str, keep_default_na=False, encoding="utf-8")
+    except pd.errors.EmptyDataError:
+        # Only blank lines, so there is no column to read
+        return frozenset()
+    questions = df.iloc[:, 0].str.strip().str.lower()
+    return frozenset(questions[questions != ""])
+
+def best_fuzzy_match(norm_query, choices, threshold=85):
+    # Highest-scoring choice at or above threshold, or None. Very large corpora
+    # are scored with cdist across all CPU cores instead of a single thread.
+    if len(choices) > PARALLEL_MATCH_THRESHOLD:
+        scores = process.cdist([norm_query], choices, scorer=fuzz.QRatio, score_cutoff=threshold, workers=-1)[0]
+        best = int(scores.argmax())
+        return choices[best] if scores[best] >= threshold else None
+    match = process.extractOne(norm_query, choices, scorer=fuzz.QRatio, score_cutoff=threshold)
+    return match[0] if match else None
+
+def normalize_query(query):
+    return query.strip().lower()
+
+# Both lookups expect a query already passed through normalize_query
+def find_best_match(norm_query, qna_dict, qna_keys, threshold=85):
+    if not qna_dict:
+        return None
+    if norm_query in qna_dict:
+        return qna_dict[norm_query]
+    best_match = best_fuzzy_match(norm_query, qna_keys, threshold)
+    return qna_dict[best_match] if best_match is not None else None
+
+def build_blocked_index(blocked_questions):
+    blocked_list = tuple(sorted(blocked_questions))
+    tokens_inv = defaultdict(set)
+    for i, question in enumerate(blocked_list):
+        for word in question.split():
+            tokens_inv[word].add(i)
+    return frozenset(blocked_questions), blocked_list, dict(tokens_inv)
+
+def is_blocked_question(norm_query, blocked_index, threshold=85):
+    blocked_exact, blocked_list, tokens_inv = blocked_index
+    if not blocked_exact:
+        return False
+    if norm_query in blocked_exact:
+        return True
+    # Only fuzzy-score blocked questions sharing at least one word with the query
+    cands = set().union(*(tokens_inv[w] for w in norm_query.split() if w in tokens_inv))
+    if not cands:
+        return False
+    choices = [blocked_list[i] for i in cands]
+    return best_fuzzy_match(norm_query, choices, threshold) is not None
+
+# Only the chain for the current uploads is ever reused; the saved index on
+# disk carries everything else, so older chains are not kept in memory.
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_qa(file_sig):
+    # file_sig is only used as the cache key: (name, mtime) for every upload
+    from process_documents import load_documents, split_documents
+    from qa_chain import (
+        create_vectorstore, load_vectorstore, load_indexed_files, save_vectorstore, build_qa_chain
+    )
+    current = dict(file_sig)
+    indexed = load_indexed_files()
+    # HNSW indexes cannot delete vectors, so a changed or removed upload means
+    # a full rebuild; otherwise only new uploads are embedded.
+    stale = indexed is None or any(current.get(name) != mtime for name, mtime in indexed.items())
+    vectorstore = None if stale else load_vectorstore()
+    if vectorstore is None:
+        docs = load_documents(UPLOAD_DIR, list(current))
+        vectorstore = create_vectorstore(split_documents(docs))
+        save_vectorstore(vectorstore, current)
+    else:
+        new_files = [name for name in current if name not in indexed]
+        if new_files:
+            chunks = split_documents(load_documents(UPLOAD_DIR, new_files))
+            if chunks:
+                vectorstore.add_documents(chunks)
+            save_vectorstore(vectorstore, current)
+    return build_qa_chain(vectorstore)
+
+def _warm_up_embeddings():
+    from qa_chain import get_embeddings
+    get_embeddings().embed_query("warmup")
+
+@st.cache_resource(show_spinner=False)
+def start_embeddings_warmup():
+    # Load the embedding model in the background once per process so the first
+    # question does not pay for it
+    thread = threading.Thread(target=_warm_up_embeddings, daemon=True)
+    thread.start()
+    return thread
+
+def extract_slide_paragraphs(pptx_path):
+    return [para for slide in iter_slide_paragraphs(pptx_path) for para in slide]
+
+async def generate_with_groq_async(client, prompt, api_key):
+    clean = prompt.replace("\n", " ").strip()
+    if len(clean) > GROQ_PROMPT_CHARS:
+        clean = clean[:GROQ_PROMPT_CHARS]
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    body = {
+        "model": GROQ_MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a helpful instructor assistant."},
+            {"role": "user", "content": clean}
+        ]
+    }
+    try:
+        for attempt in range(GROQ_MAX_RETRIES + 1):
+            res = await client.post(GROQ_URL, headers=headers, content=orjson.dumps(body))
+            if res.status_code not in GROQ_RETRY_STATUSES or attempt == GROQ_MAX_RETRIES:
+                break
+            # Exponential backoff, honouring Retry-After when Groq sends one
+            delay = 0.5 * 2 ** attempt
+            retry_after = res.headers.get("retry-after")
+            if retry_after and retry_after.replace(".", "", 1).isdigit():
+                if float(retry_after) > GROQ_MAX_RETRY_WAIT:
+                    return f"❌ Groq is rate limiting requests. Try again in {retry_after}s."
+                delay = max(delay, float(retry_after))
+            await asyncio.sleep(min(delay, GROQ_MAX_RETRY_WAIT))
+        if res.status_code == 200:
+            return orjson.loads(res.content)["choices"][0]["message"]["content"]
+        else:
+            return f"❌ Failed to generate. Code: {res.status_code}\n{res.text}"
+    except Exception as e:
+        return f"❌ Exception: {str(e)}"
+
+async def _gather_with_groq(prompts, api_key):
+    # One pooled client per batch: an AsyncClient is bound to the event loop it
+    # was first used on, and every asyncio.run() call below starts a new loop.
+    limits = httpx.Limits(max_keepalive_connections=16)
+    timeout = httpx.Timeout(60.0, connect=10.0)
+    async with httpx.AsyncClient(http2=True, limits=limits, timeout=timeout) as client:
+        return await asyncio.gather(*(generate_with_groq_async(client, p, api_key) for p in prompts))
+
+@st.cache_resource(show_spinner=False)
+def get_llm_cache():
+    return diskcache.Cache(LLM_CACHE_DIR)
+
+def llm_cache_key(prompt, model=GROQ_MODEL):
+    return hashlib.sha256((model + prompt).encode()).hexdigest()
+
+def generate_batch_with_groq(prompts):
+    # Serve repeated prompts from the on-disk cache; only misses hit the API
+    cache = get_llm_cache()
+    keys = [llm_cache_key(p) for p in prompts]
+    results = [cache.get(k) for k in keys]
+    missing = [i for i, r in enumerate(results) if r is None]
+    if not missing:
+        return results
+    api_key = st.secrets.get("GROQ_API_KEY") or os.getenv("GROQ_API_KEY")
+    if not api_key:
+        return [r if r is not None else "❌ Missing GROQ_API_KEY." for r in results]
+    fresh = asyncio.run(_gather_with_groq([prompts[i] for i in missing], api_key))
+    for i, result in zip(missing, fresh):
+        results[i] = result
+        if not result.startswith("❌"):
+            cache.set(keys[i], result)
+    return results
+
+def generate_with_groq(prompt):
+    return generate_batch_with_groq([prompt])[0]
+
+def review_questions_prompt(slide_texts, num_questions=10):
+    # Size the slide text to what is left of the Groq cap after the fixed
+    # instructions, so the closing instruction is never truncated away
+    head = f"Generate {num_questions} open-ended review questions based on the following content.\n\n"
+    tail = "\n\nOnly list the questions. No answers."
+    budget = GROQ_PROMPT_CHARS - len(head) - len(tail)
+    joined = " ".join(condense_slide_texts(slide_texts, max_chars=budget))
+    return head + joined + tail
+
+def load_quiz_rows(quiz_path):
+    # Returns None when a required column is missing; otherwise every row with
+    # all required fields filled in.
+    # utf-8-sig strips the BOM Excel writes on "CSV UTF-8" exports
+    with open(quiz_path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        if not all(col in (reader.fieldnames or []) for col in QUIZ_COLUMNS):
+            return None
+        return [row for row in reader if all(row.get(col) for col in QUIZ_COLUMNS)]
+
+def answer_letter(index_value):
+    try:
+        return ANSWER_LETTERS.get(float(index_value), "⚠️ Invalid")
+    except ValueError:
+        return "⚠️ Invalid"
+
+def generate_rebuttal_analysis(full_text):
+    prompt = (
+        "You are a debate coach. Identify 3–5 specific claims from this student-written argument that are vulnerable to rebuttal.\n"
+        "- Quote the sentence.\n"
+        "- Explain why it's weak (emotional, unsupported, vague, etc.).\n"
+        "- DO NOT provide sources or citations.\n\n"
+        f"{full_text}"
+    )
+    return generate_with_groq(prompt)
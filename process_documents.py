@@ -1,43 +1,42 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from langchain_community.document_loaders import (
     PyPDFLoader,
     Docx2txtLoader,
     UnstructuredPowerPointLoader,
 )
-from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-def load_documents(upload_dir):
-    docs = []
-    for file in os.listdir(upload_dir):
+MAX_LOAD_WORKERS = 8
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+def load_documents(upload_dir, files=None):
+    loaders = []
+    for file in os.listdir(upload_dir) if files is None else files:
         path = os.path.join(upload_dir, file)
         if file.endswith(".pdf"):
-            loader = PyPDFLoader(path)
+            loaders.append(PyPDFLoader(path))
         elif file.endswith(".docx"):
-            loader = Docx2txtLoader(path)
+            loaders.append(Docx2txtLoader(path))
         elif file.endswith(".pptx"):
-            loader = UnstructuredPowerPointLoader(path)
-        else:
-            continue
-        docs.extend(loader.load())
+            loaders.append(UnstructuredPowerPointLoader(path))
+    if not loaders:
+        return []
+
+    # Threads, not processes: parsing is mostly file I/O and native code
+    docs = []
+    with ThreadPoolExecutor(max_workers=min(MAX_LOAD_WORKERS, len(loaders))) as ex:
+        for loaded in ex.map(lambda loader: loader.load(), loaders):
+            docs.extend(loaded)
     return docs
 
 def split_documents(documents):
-    smart_chunks = []
-
-    for doc in documents:
-        # Split on double newlines (usually paragraph or section breaks)
-        raw_chunks = doc.page_content.split("\n\n")
-
-        for chunk in raw_chunks:
-            chunk = chunk.strip()
-
-            # Ignore empty or tiny chunks
-            if len(chunk) < 50:
-                continue
-
-            # Group nearby lines (helps with bullet lists, date lines, etc.)
-            grouped_chunk = "\n".join(line.strip() for line in chunk.split("\n") if line.strip())
-
-            smart_chunks.append(Document(page_content=grouped_chunk, metadata=doc.metadata))
-
-    return smart_chunks
+    # Bounded, overlapping chunks keep embedding batches and retrieved context
+    # a predictable size; metadata is carried over by the splitter.
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+    return splitter.split_documents(documents)
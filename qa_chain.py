@@ -1,22 +1,86 @@
 import os
-from langchain_community.vectorstores import DocArrayInMemorySearch
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import json
+import shutil
+import threading
+from functools import lru_cache
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from sentence_transformers import SentenceTransformer
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 from langchain.llms import Ollama
 
 EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_DIM = 384
+EMBED_BATCH_SIZE = 64
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+VECTOR_PATH = "vectorstore"
+INDEXED_FILES = os.path.join(VECTOR_PATH, "indexed_files.json")
+
+_EMBEDDINGS_LOCK = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _load_embeddings():
+    # Embeddings are unit-normalized so FAISS can rank by plain inner product
+    import torch
+    return HuggingFaceEmbeddings(
+        model_name=EMBED_MODEL,
+        model_kwargs={"device": "cuda" if torch.cuda.is_available() else "cpu"},
+        encode_kwargs={"batch_size": EMBED_BATCH_SIZE, "normalize_embeddings": True},
+    )
+
+def get_embeddings():
+    # Loading the sentence-transformers model is slow; share one per process.
+    # The lock stops the startup warm-up thread and a first query from both
+    # loading it.
+    with _EMBEDDINGS_LOCK:
+        return _load_embeddings()
 
 def create_vectorstore(chunks):
-    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-    vectorstore = DocArrayInMemorySearch.from_documents(documents=chunks, embedding=embeddings)
+    # HNSW graph instead of the default flat index: sub-linear search, and it
+    # needs no training so later uploads can still be added incrementally.
+    index = faiss.IndexHNSWFlat(EMBED_DIM, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    vectorstore = FAISS(
+        embedding_function=get_embeddings(),
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
+    if chunks:
+        vectorstore.add_documents(chunks)
     return vectorstore
 
 def load_vectorstore():
-    # For DocArrayInMemorySearch, vectorstore is recreated during this session
-    return None
+    if not os.path.exists(os.path.join(VECTOR_PATH, "index.faiss")):
+        return None
+    return FAISS.load_local(
+        VECTOR_PATH,
+        get_embeddings(),
+        allow_dangerous_deserialization=True,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
+
+def load_indexed_files():
+    # Sidecar of {filename: mtime} for everything already in the saved index
+    if not os.path.exists(INDEXED_FILES):
+        return None
+    with open(INDEXED_FILES, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_vectorstore(vectorstore, indexed_files):
+    vectorstore.save_local(VECTOR_PATH)
+    with open(INDEXED_FILES, "w", encoding="utf-8") as f:
+        json.dump(indexed_files, f)
+
+def clear_vectorstore():
+    shutil.rmtree(VECTOR_PATH, ignore_errors=True)
 
 def build_qa_chain(vectorstore):
     retriever = vectorstore.as_retriever()
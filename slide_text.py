@@ -0,0 +1,65 @@
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+SLIDE_PART = re.compile(r"ppt/slides/slide(\d+)\.xml")
+A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+A_P = A_NS + "p"
+A_T = A_NS + "t"
+A_BR = A_NS + "br"
+# Text-bearing shapes (text boxes, placeholders, auto shapes) keep their text in
+# <p:txBody>; pictures, connectors and graphic frames have none.
+P_TXBODY = "{http://schemas.openxmlformats.org/presentationml/2006/main}txBody"
+MAX_PROMPT_TOKENS = 1500
+
+def iter_slide_paragraphs(pptx_path):
+    # Read the slide XML parts directly instead of building python-pptx's
+    # object model; yields one list of paragraph strings per slide, in order.
+    with zipfile.ZipFile(pptx_path) as z:
+        names = sorted(
+            (n for n in z.namelist() if SLIDE_PART.fullmatch(n)),
+            key=lambda n: int(SLIDE_PART.fullmatch(n).group(1)),
+        )
+        for name in names:
+            root = ET.fromstring(z.read(name))
+            yield [
+                text
+                for body in root.iter(P_TXBODY)
+                for para in body.iter(A_P)
+                if (text := paragraph_text(para))
+            ]
+
+def paragraph_text(para):
+    # <a:br/> is a soft line break inside a paragraph; keep it as a space so
+    # the words on either side are not glued together.
+    return "".join(
+        " " if el.tag == A_BR else el.text or ""
+        for el in para.iter()
+        if el.tag in (A_T, A_BR)
+    ).strip()
+
+def dedupe_texts(texts, seen=None):
+    # Exact and near-duplicate (same leading 80 chars) paragraphs are dropped,
+    # which removes headers/footers repeated on every slide.
+    seen = set() if seen is None else seen
+    unique = []
+    for text in texts:
+        key = text[:80].lower()
+        if key not in seen:
+            seen.add(key)
+            unique.append(text)
+    return unique
+
+def condense_slide_texts(slide_texts, max_tokens=MAX_PROMPT_TOKENS, max_chars=None):
+    # Dedupe, then keep texts until the rough token estimate (chars / 4) is
+    # spent, or max_chars when the caller has a hard character limit
+    budget = max_tokens * 4 if max_chars is None else max_chars
+    kept = []
+    for text in dedupe_texts(slide_texts):
+        if len(text) > budget:
+            if budget > 0:
+                kept.append(text[:budget])
+            break
+        kept.append(text)
+        budget -= len(text) + 1
+    return kept